@@ -7,8 +7,13 @@
 # characters, or glyphs with shapes that appear identical or very similar.
 # Example: 0 and O
 
+import binascii
 import doctest
+import itertools
+import os
 import random
+import re
+import struct
 import sys
 import zlib
 
@@ -23,6 +28,23 @@ LOWERCASE = 'abcdefghijkmnpqrstuvwxyz'
 UPPERCASE = 'ABCDEFGHJKLMNPQRSTUVWXYZ'
 DIGITS    = '23456789'
 
+# The same tables as ASCII bytes, so generate() can build its result as raw
+# bytes. (Indexing a bytearray gives ints on both Python 2 and 3.)
+_GLYPHS_BYTES    = bytearray(GLYPHS.encode('ascii'))
+_LETTERS_BYTES   = bytearray(LETTERS.encode('ascii'))
+_LOWERCASE_BYTES = bytearray(LOWERCASE.encode('ascii'))
+_UPPERCASE_BYTES = bytearray(UPPERCASE.encode('ascii'))
+_DIGITS_BYTES    = bytearray(DIGITS.encode('ascii'))
+
+# Maps each generate() format specifier to its table.
+_SPECIFIER_TABLES = {
+    '*': _GLYPHS_BYTES,
+    'c': _LETTERS_BYTES,
+    'd': _DIGITS_BYTES,
+    'l': _LOWERCASE_BYTES,
+    'u': _UPPERCASE_BYTES,
+}
+
 HOMOGLYPHS = 'lIoO01'
 HOMOGLYPHS_LETTERS = 'lIoO'
 HOMOGLYPHS_LOWERCASE = 'lo'
@@ -39,6 +61,16 @@ DEFAULT_LENGTH = 5
 
 RUNNING_PY_2 = sys.version_info[0] < 3
 
+# Convert between shortstrings and their bytes. These are bound once here so
+# that generate() and isValid() don't have to check RUNNING_PY_2 on every call.
+# (Shortstrings are ASCII, so decoding and encoding as UTF-8 is fine.)
+if RUNNING_PY_2:
+    _bytesToStr = str
+    _strToBytes = bytearray
+else:
+    _bytesToStr = bytearray.decode
+    _strToBytes = str.encode
+
 
 # Quick sanity check; the GLYPHS string assignment line should NEVER change and NEVER contain homoglyphs.
 assert len(frozenset(GLYPHS)) == 56 # Note: Don't use LEN_GLYPHS here; we want to specifically check that GLYPHS assignment source code hasn't changed.
@@ -52,6 +84,20 @@ assert '1' not in GLYPHS
 # Uses the platform's source of entropy for true randomness, not pseudorandomness.
 SYS_RAND = random.SystemRandom()
 
+# Cache of format strings compiled by _compileFormat(), since callers tend to
+# reuse the same few format strings over and over.
+_COMPILED_FORMAT_CACHE = {}
+_COMPILED_FORMAT_CACHE_SIZE = 256
+
+# 56 ** 11 < 2 ** 64 < 56 ** 12, so a random 64-bit word can give 11 glyphs as
+# its base-56 digits. See _randomGlyphs().
+_GLYPHS_PER_WORD = 11
+_GLYPHS_WORD_LIMIT = LEN_GLYPHS ** _GLYPHS_PER_WORD
+_GLYPHS_PLACES = tuple(LEN_GLYPHS ** i for i in range(_GLYPHS_PER_WORD))
+
+# Matches format strings that only contain valid specifiers.
+_SSFORMAT_REGEX = re.compile(r'[*clud]+\Z')
+
 
 class ShortStrException(Exception):
     """This exception is raised for any shortstr-releated exception. If the
@@ -60,7 +106,50 @@ class ShortStrException(Exception):
     pass
 
 
-def generate(ssformat='*' * DEFAULT_LENGTH, includeChecksum=True, repeatFunc=None):
+class _FastRandom(object):
+    """A fast source of pseudorandom bytes for generate(secure=False). This is
+    a Mersenne Twister seeded from the platform's source of entropy, and
+    reseeded with fresh entropy every RESEED_INTERVAL bytes and after the
+    process forks (so forked workers don't produce the same shortstrings)."""
+
+    RESEED_INTERVAL = 1 << 20
+
+    def __init__(self):
+        self._rand = random.Random()
+        self._reseed()
+
+        # Set to True once _reseed() is registered to run in forked children,
+        # so that randomBytes() doesn't need to check the pid on every call.
+        self.reseedsOnFork = False
+
+    def _reseed(self):
+        # Mix fresh entropy into the current state rather than replacing it.
+        entropy = int(binascii.hexlify(os.urandom(32)), 16)
+        self._rand.seed(self._rand.getrandbits(256) ^ entropy)
+        self._pid = os.getpid()
+        self._bytesLeft = self.RESEED_INTERVAL
+
+    def randomBytes(self, numBytes):
+        """Returns numBytes pseudorandom bytes, like os.urandom()."""
+        if self._bytesLeft < numBytes or (not self.reseedsOnFork and self._pid != os.getpid()):
+            self._reseed()
+        self._bytesLeft -= numBytes
+
+        if numBytes == 0:
+            return b''
+        bits = self._rand.getrandbits(8 * numBytes)
+        if RUNNING_PY_2:
+            return binascii.unhexlify('%0*x' % (2 * numBytes, bits))
+        else:
+            return bits.to_bytes(numBytes, 'little')
+
+_FAST_RAND = _FastRandom()
+if hasattr(os, 'register_at_fork'): # Python 3.7 and later
+    os.register_at_fork(after_in_child=_FAST_RAND._reseed)
+    _FAST_RAND.reseedsOnFork = True
+
+
+def generate(ssformat='*' * DEFAULT_LENGTH, includeChecksum=True, repeatFunc=None, secure=True):
     """Returns a short string with the given format. The format string is
     a mini-language, with each character representing a range of characters:
 
@@ -77,7 +166,9 @@ def generate(ssformat='*' * DEFAULT_LENGTH, includeChecksum=True, repeatFunc=Non
     (These ranges will never include the homoglyph characters l, I, o, O, 0, 1.)
 
     If includeChecksum is True, the last character is not random but rather used
-    to provide a checksum for the rest of the short string.
+    to provide a checksum for the rest of the short string. (The checksum
+    character is the CRC-32 of the rest of the short string, modulo 56, used as
+    an index into GLYPHS.)
 
     Optionally, a function can be provided to check if the short string is a
     repeat of one made before. This function is passed one string argument and
@@ -90,47 +181,202 @@ def generate(ssformat='*' * DEFAULT_LENGTH, includeChecksum=True, repeatFunc=Non
         repeatFunc=lambda ss: ss in ['list', 'of', 'repeats']
 
     ...for the repeatFunc parameter.
+
+    If secure is True, the random characters come from the platform's source
+    of entropy (os.urandom()). If secure is False, they come from a faster
+    pseudorandom generator that is only seeded from the platform's source of
+    entropy. These shortstrings are still unpredictable enough to not collide,
+    but shouldn't be used as secrets (such as password reset tokens).
     """
 
-    # Generate a random shortstr
-    while True: # loop until an unrepeated shortstr has been generated
-        ss = []
-
-        for i, specifier in enumerate(ssformat):
-            if specifier == '*':
-                ss.append(SYS_RAND.choice(GLYPHS))
-            elif specifier == 'c':
-                ss.append(SYS_RAND.choice(LETTERS))
-            elif specifier == 'd':
-                ss.append(SYS_RAND.choice(DIGITS))
-            elif specifier == 'l':
-                ss.append(SYS_RAND.choice(LOWERCASE))
-            elif specifier == 'u':
-                ss.append(SYS_RAND.choice(UPPERCASE))
-            else:
-                raise ShortStrException('"%s" is an invalid shortstr format specifier: must be *, c, d, l, or u' % specifier)
-
-        # Add checksum, if needed.
-        if includeChecksum:
-            if RUNNING_PY_2:
-                checksum = zlib.adler32(''.join(ss).decode('utf-8'))
-            else:
-                checksum = zlib.adler32(bytes(''.join(ss), encoding='utf-8'))
-            ss.append(GLYPHS[checksum % LEN_GLYPHS])
+    runs, numEntropyBytes = _compileFormat(ssformat)
+    randomBytes = os.urandom if secure else _FAST_RAND.randomBytes
+    numChars = len(ssformat)
+    if includeChecksum:
+        ssLen = numChars + 1 # Leave room for the checksum character.
+    else:
+        ssLen = numChars
 
-        ssAsString = ''.join(ss)
+    # Each attempt overwrites every byte of ss, so it can be reused when
+    # repeatFunc sends us around the loop again.
+    ss = bytearray(ssLen)
+
+    # Generate a random shortstr, drawing all of its entropy with one
+    # randomBytes() call.
+    while True: # loop until an unrepeated shortstr has been generated
+        _fillShortStr(ss, runs, randomBytes(numEntropyBytes), includeChecksum, randomBytes)
+        ssAsString = _bytesToStr(ss)
 
         if repeatFunc is None or not repeatFunc(ssAsString):
             return ssAsString # sAsStringt is not a repeat, so we can now return
         # Otherwise, continue and try generating a new shortstring.
 
 
+def generateMany(count, ssformat='*' * DEFAULT_LENGTH, includeChecksum=True, repeatFunc=None, secure=True):
+    """Returns a list of count short strings. This is the same as calling
+    generate() count times with the same arguments, but faster, since the
+    random bytes for all of the short strings are drawn at once.
+
+    Note that repeatFunc is only passed each new short string, so it won't
+    catch repeats inside the returned list unless it keeps track of the short
+    strings it has been passed.
+
+    >>> len(generateMany(3))
+    3
+    """
+
+    # Validate count argument.
+    if not isinstance(count, int) or count < 0:
+        raise ShortStrException('count argument must be a non-negative integer')
+
+    runs, numEntropyBytes = _compileFormat(ssformat)
+    randomBytes = os.urandom if secure else _FAST_RAND.randomBytes
+    numChars = len(ssformat)
+    if includeChecksum:
+        ssLen = numChars + 1 # Leave room for the checksum character.
+    else:
+        ssLen = numChars
+    ss = bytearray(ssLen)
+
+    shortStrs = []
+    entropy = randomBytes(count * numEntropyBytes)
+    entropyPos = 0
+    while len(shortStrs) < count:
+        if entropyPos + numEntropyBytes > len(entropy):
+            # repeatFunc rejected some shortstrs, so draw more for the rest.
+            entropy = randomBytes((count - len(shortStrs)) * numEntropyBytes)
+            entropyPos = 0
+
+        _fillShortStr(ss, runs, entropy[entropyPos:entropyPos + numEntropyBytes], includeChecksum, randomBytes)
+        entropyPos += numEntropyBytes
+        ssAsString = _bytesToStr(ss)
+
+        if repeatFunc is None or not repeatFunc(ssAsString):
+            shortStrs.append(ssAsString)
+    return shortStrs
+
+
+def _fillShortStr(ss, runs, entropy, includeChecksum, randomBytes):
+    """Overwrites the bytearray ss with a new random shortstr, using the runs
+    from _compileFormat() and the random bytes in entropy. If includeChecksum
+    is True, the last byte of ss is set to the checksum character. Always
+    returns None.
+
+    Each run of the same specifier (e.g. 'ddd' in 'cdddcc') needs only one
+    comprehension and one slice assignment. The checksum is computed run by
+    run as we go. (Python 2's crc32() can return a negative number, so it is
+    masked to get the same checksum on all versions.)"""
+    pos = 0
+    entropyPos = 0
+    checksum = 0
+    for randomChars, table, runLen, runEntropyBytes in runs:
+        chars = randomChars(table, runLen, entropy[entropyPos:entropyPos + runEntropyBytes], randomBytes)
+        ss[pos:pos + runLen] = chars
+        if includeChecksum:
+            checksum = zlib.crc32(chars, checksum)
+        pos += runLen
+        entropyPos += runEntropyBytes
+
+    # Add checksum, if needed.
+    if includeChecksum:
+        ss[pos] = _GLYPHS_BYTES[(checksum & 0xFFFFFFFF) % LEN_GLYPHS]
+
+
+def _compileFormat(ssformat):
+    """Returns a (runs, numEntropyBytes) tuple for ssformat. The runs are a
+    tuple of (randomChars, table, runLength, runEntropyBytes) tuples for each
+    run of the same specifier in ssformat: randomChars is the function that
+    picks the run's characters from table (the specifier's bytearray of
+    characters) using runEntropyBytes random bytes. numEntropyBytes is the
+    total for all runs. For example, 'cdddcc' becomes the runs for 'c' * 1,
+    'd' * 3, and 'c' * 2.
+
+    Results are cached, so generate() doesn't have to look at each specifier
+    on every call. Raises ShortStrException if ssformat has an invalid
+    specifier.
+
+    >>> _compileFormat('cdddcc')[0] == ((_randomChars, _LETTERS_BYTES, 1, 4), (_randomChars, _DIGITS_BYTES, 3, 12), (_randomChars, _LETTERS_BYTES, 2, 8))
+    True
+    """
+    try:
+        return _COMPILED_FORMAT_CACHE[ssformat]
+    except KeyError:
+        cacheable = True
+    except TypeError: # ssformat is unhashable, such as a list of specifiers.
+        cacheable = False
+
+    runs = []
+    numEntropyBytes = 0
+    for specifier, run in itertools.groupby(ssformat):
+        try:
+            table = _SPECIFIER_TABLES[specifier]
+        except KeyError:
+            raise ShortStrException('"%s" is an invalid shortstr format specifier: must be *, c, d, l, or u' % specifier)
+
+        runLen = sum(1 for _ in run)
+        if specifier == '*' and runLen >= _GLYPHS_PER_WORD:
+            runs.append((_randomGlyphs, table, runLen, 8 * -(-runLen // _GLYPHS_PER_WORD)))
+        else:
+            runs.append((_randomChars, table, runLen, 4 * runLen))
+        numEntropyBytes += runs[-1][3]
+
+    compiled = (tuple(runs), numEntropyBytes)
+    if cacheable:
+        if len(_COMPILED_FORMAT_CACHE) >= _COMPILED_FORMAT_CACHE_SIZE:
+            _COMPILED_FORMAT_CACHE.clear()
+        _COMPILED_FORMAT_CACHE[ssformat] = compiled
+    return compiled
+
+
+def _randomChars(table, count, entropy, randomBytes=os.urandom):
+    """Returns a bytearray of count characters picked at random from table (a
+    bytearray), using the 4 * count random bytes in entropy. Any extra bytes
+    needed are drawn from the randomBytes function.
+
+    Each character comes from a 32-bit word using Lemire's multiply-high
+    reduction: the high 32 bits of word * len(table) are the index, and words
+    whose low 32 bits fall below 2**32 % len(table) are biased and get
+    replaced by freshly drawn words (this almost never happens)."""
+    tableLen = len(table)
+    threshold = 0x100000000 % tableLen
+    chars = bytearray()
+    while True:
+        chars.extend([table[(word * tableLen) >> 32]
+                      for word in struct.unpack('<%dI' % (len(entropy) // 4), entropy)
+                      if (word * tableLen) & 0xFFFFFFFF >= threshold])
+        if len(chars) == count:
+            return chars
+        entropy = randomBytes(4 * (count - len(chars)))
+
+
+def _randomGlyphs(table, count, entropy, randomBytes=os.urandom):
+    """Returns a bytearray of count characters picked at random from table,
+    which must be the 56 glyphs of the * specifier, using the random bytes in
+    entropy (8 for every 11 characters). Any extra bytes needed are drawn
+    from the randomBytes function.
+
+    Each 64-bit word below 56 ** 11 gives 11 characters as its base-56 digits,
+    which uses far less entropy than picking each character from its own
+    32-bit word. Words at or above 56 ** 11 (about 8% of them) are rejected so
+    that every digit is unbiased."""
+    chars = bytearray()
+    while True:
+        chars.extend([table[word // place % LEN_GLYPHS]
+                      for word in struct.unpack('<%dQ' % (len(entropy) // 8), entropy)
+                      if word < _GLYPHS_WORD_LIMIT
+                      for place in _GLYPHS_PLACES])
+        if len(chars) >= count:
+            del chars[count:]
+            return chars
+        entropy = randomBytes(8 * -(-(count - len(chars)) // _GLYPHS_PER_WORD))
+
+
 def isValid(ssToCheck):
     """Returns True if ssToCheck is a shortstr with a valid checksum. Note that
     to have a valid checksum, ssToCheck must have been generated by
     generate() with includeChecksum=True.
 
-    >>> isValid('QEynbi')
+    >>> isValid('QEynbD')
     True
     >>> isValid('QEynbX')
     False
@@ -140,12 +386,38 @@ def isValid(ssToCheck):
     if not isinstance(ssToCheck, str) or len(ssToCheck) < 2:
         raise ShortStrException('ssToCheck argument must be a string at least two characters long')
 
-    if RUNNING_PY_2:
-        checksum = zlib.adler32(ssToCheck[:-1].decode('utf-8'))
-    else:
-        checksum = zlib.adler32(bytes(ssToCheck[:-1], encoding='utf-8'))
+    # Encode once and work on the bytes, rather than slicing and encoding the
+    # str. (A non-ASCII last character encodes to a byte that can never match
+    # a glyph, so this returns False for it, same as comparing characters.)
+    ssBytes = _strToBytes(ssToCheck)
+    checksum = zlib.crc32(ssBytes[:-1]) & 0xFFFFFFFF
 
-    return ssToCheck[-1] == GLYPHS[checksum % LEN_GLYPHS] # Make sure last character in ssToCheck is the correct checksum character.
+    return ssBytes[-1] == _GLYPHS_BYTES[checksum % LEN_GLYPHS] # Make sure last character in ssToCheck is the correct checksum character.
+
+
+def isValidMany(ssToCheckList):
+    """Returns a list of bools, one for each string in ssToCheckList, that are
+    True if the string is a shortstr with a valid checksum. This is the same as
+    calling isValid() on each string, but faster for large batches.
+
+    >>> isValidMany(['QEynbD', 'QEynbX'])
+    [True, False]
+    """
+    crc32 = zlib.crc32
+    strToBytes = _strToBytes
+    glyphsBytes = _GLYPHS_BYTES
+
+    results = []
+    for ssToCheck in ssToCheckList:
+        # Validate ssToCheck argument.
+        if not isinstance(ssToCheck, str) or len(ssToCheck) < 2:
+            raise ShortStrException('ssToCheck argument must be a string at least two characters long')
+
+        ssBytes = strToBytes(ssToCheck)
+        checksum = crc32(ssBytes[:-1]) & 0xFFFFFFFF
+
+        results.append(ssBytes[-1] == glyphsBytes[checksum % LEN_GLYPHS])
+    return results
 
 
 def _checkSSFormatArg(ssformat):
@@ -167,9 +439,8 @@ def _checkSSFormatArg(ssformat):
     if not isinstance(ssformat, str):
         raise ShortStrException('ssformat argument must be a string with only characters *, c, l, u, and d')
 
-    for c in ssformat:
-        if c not in '*clud':
-            raise ShortStrException('ssformat argument must be a string with only characters *, c, l, u, and d')
+    if not _SSFORMAT_REGEX.match(ssformat):
+        raise ShortStrException('ssformat argument must be a string with only characters *, c, l, u, and d')
 
 
 
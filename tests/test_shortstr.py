@@ -1,5 +1,7 @@
+import os
 import pytest
 import random
+import struct
 import time
 
 #   sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
@@ -134,6 +136,99 @@ def test_format_param():
             assert ss[i].isupper()
 
 
+def test_secure_param():
+    # Test the secure parameter
+    for trial in range(TRIALS):
+        ss = shortstr.generate(secure=False)
+        assert _isValidShortStr(ss, shortstr.DEFAULT_LENGTH + 1)
+        assert shortstr.isValid(ss)
+
+        ss = shortstr.generate('cdddcc', includeChecksum=False, secure=False)
+        assert _isValidShortStr(ss, 6)
+        assert ss[0].isalpha() and ss[1:4].isdigit() and ss[4:].isalpha()
+
+    assert set(shortstr.generate('*' * 5000, includeChecksum=False, secure=False)) == set(shortstr.GLYPHS)
+
+
+def test__FastRandom():
+    rand = shortstr._FastRandom()
+    assert rand.randomBytes(0) == b''
+    assert len(rand.randomBytes(1)) == 1
+    assert len(rand.randomBytes(1000)) == 1000
+
+    # Test that it reseeds after RESEED_INTERVAL bytes and after a fork.
+    rand._bytesLeft = 10
+    rand.randomBytes(11)
+    assert rand._bytesLeft == rand.RESEED_INTERVAL - 11
+
+    pid = rand._pid
+    rand._pid = -1
+    rand.randomBytes(1)
+    assert rand._pid == pid
+    assert rand._bytesLeft == rand.RESEED_INTERVAL - 1
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='requires os.fork()')
+def test_secure_param_after_fork():
+    # Forked processes must not generate the same insecure shortstrings.
+    shortstr.generate(secure=False)
+    readFd, writeFd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.write(writeFd, shortstr.generate('*' * 20, includeChecksum=False, secure=False).encode('ascii'))
+        os._exit(0)
+    os.close(writeFd)
+    os.waitpid(pid, 0)
+    childSS = os.read(readFd, 20).decode('ascii')
+    os.close(readFd)
+    assert childSS != shortstr.generate('*' * 20, includeChecksum=False, secure=False)
+
+
+def test_generateMany():
+    for trial in range(TRIALS):
+        shortStrs = shortstr.generateMany(10)
+        assert len(shortStrs) == 10
+        for ss in shortStrs:
+            assert type(ss) == str
+            assert _isValidShortStr(ss, shortstr.DEFAULT_LENGTH + 1)
+            assert shortstr.isValid(ss)
+
+        for ss in shortstr.generateMany(5, 'cdddcc' + '*' * 11, includeChecksum=False, secure=False):
+            assert _isValidShortStr(ss, 17)
+            assert ss[0].isalpha() and ss[1:4].isdigit() and ss[4:6].isalpha()
+
+    assert shortstr.generateMany(0) == []
+    assert len(set(shortstr.generateMany(1000, '*' * 20))) == 1000
+
+    # Test that repeatFunc rejections are replaced, here by rejecting repeats
+    # within the list itself.
+    seen = set()
+    def repeatFunc(ss):
+        isRepeat = ss in seen
+        seen.add(ss)
+        return isRepeat
+    shortStrs = shortstr.generateMany(8, 'd', includeChecksum=False, repeatFunc=repeatFunc)
+    assert sorted(shortStrs) == list(shortstr.DIGITS)
+
+    with pytest.raises(shortstr.ShortStrException):
+        shortstr.generateMany(-1)
+
+    with pytest.raises(shortstr.ShortStrException):
+        shortstr.generateMany('10')
+
+    with pytest.raises(shortstr.ShortStrException):
+        shortstr.generateMany(3, '**X**')
+
+
+def test_all_glyphs_generated():
+    # Every character in each specifier's range should eventually be produced.
+    assert set(shortstr.generate('*' * 5000, includeChecksum=False)) == set(shortstr.GLYPHS)
+    assert set(shortstr.generate('c' * 5000, includeChecksum=False)) == set(shortstr.LETTERS)
+    assert set(shortstr.generate('d' * 5000, includeChecksum=False)) == set(shortstr.DIGITS)
+    assert set(shortstr.generate('l' * 5000, includeChecksum=False)) == set(shortstr.LOWERCASE)
+    assert set(shortstr.generate('u' * 5000, includeChecksum=False)) == set(shortstr.UPPERCASE)
+
+
 def test_includeChecksum_param():
     # Test the includeChecksum paramter
     for trial in range(TRIALS):
@@ -156,6 +251,16 @@ def test_repeatFunc_param():
         ss = shortstr.generate('*', repeatFunc=lambda x: False if random.randint(0, 10) == 0 else True)
         assert _isValidShortStr(ss, 2)
 
+        # Reject the first few shortstrings, and make sure each retry is a
+        # complete, valid shortstring of its own.
+        seen = []
+        ss = shortstr.generate('cdddcc' + '*' * 11, repeatFunc=lambda x: seen.append(x) or len(seen) < 5)
+        assert ss == seen[-1]
+        assert len(seen) == 5
+        for seenSS in seen:
+            assert _isValidShortStr(seenSS, 17 + 1)
+            assert shortstr.isValid(seenSS)
+
         # Keep generating shortstrings until 'A' is generated.
         ss = shortstr.generate('*', includeChecksum=False, repeatFunc=lambda x: x != 'A')
         assert _isValidShortStr(ss, 1)
@@ -171,9 +276,63 @@ def test__checkSSFormatArg():
     with pytest.raises(shortstr.ShortStrException):
         shortstr._checkSSFormatArg('**********X')
 
+    with pytest.raises(shortstr.ShortStrException):
+        shortstr._checkSSFormatArg('*****\n')
+
+    shortstr._checkSSFormatArg('*cdlu')
+
+
+def test__compileFormat():
+    randomChars = shortstr._randomChars
+    assert shortstr._compileFormat('cdddcc') == (((randomChars, shortstr._LETTERS_BYTES, 1, 4), (randomChars, shortstr._DIGITS_BYTES, 3, 12), (randomChars, shortstr._LETTERS_BYTES, 2, 8)), 24)
+    assert shortstr._compileFormat('*****') == (((randomChars, shortstr._GLYPHS_BYTES, 5, 20),), 20)
+    assert shortstr._compileFormat('lu') == (((randomChars, shortstr._LOWERCASE_BYTES, 1, 4), (randomChars, shortstr._UPPERCASE_BYTES, 1, 4)), 8)
+    assert shortstr._compileFormat('') == ((), 0)
+
+    # Long runs of * use _randomGlyphs(), which needs 8 bytes per 11 characters.
+    assert shortstr._compileFormat('*' * 11) == (((shortstr._randomGlyphs, shortstr._GLYPHS_BYTES, 11, 8),), 8)
+    assert shortstr._compileFormat('*' * 23 + 'd') == (((shortstr._randomGlyphs, shortstr._GLYPHS_BYTES, 23, 24), (randomChars, shortstr._DIGITS_BYTES, 1, 4)), 28)
+
+    with pytest.raises(shortstr.ShortStrException):
+        shortstr._compileFormat('**X**')
+
+    with pytest.raises(shortstr.ShortStrException):
+        shortstr.generate('**X**')
+
+    # Unhashable format strings, like a list of specifiers, still work but
+    # aren't cached.
+    assert shortstr._compileFormat(['c', 'd', 'd']) == shortstr._compileFormat('cdd')
+    assert _isValidShortStr(shortstr.generate(['*', '*']), 2 + 1)
+
+
+def test__randomChars():
+    # A word of 0 falls in the biased remainder for a 56-character table, so
+    # it must be redrawn rather than mapped to the first glyph.
+    for trial in range(TRIALS):
+        chars = shortstr._randomChars(shortstr._GLYPHS_BYTES, 1, struct.pack('<I', 0))
+        assert len(chars) == 1
+        assert chars.decode('ascii') in shortstr.GLYPHS
+
+    # The high 32 bits of word * len(table) select the character.
+    assert shortstr._randomChars(shortstr._DIGITS_BYTES, 3, struct.pack('<3I', 0, 0x80000000, 0xFFFFFFFF)) == bytearray(b'269')
+
+
+def test__randomGlyphs():
+    # Each word gives 11 glyphs as its base-56 digits, least significant first.
+    assert shortstr._randomGlyphs(shortstr._GLYPHS_BYTES, 11, struct.pack('<Q', 0)) == bytearray(b'a' * 11)
+    assert shortstr._randomGlyphs(shortstr._GLYPHS_BYTES, 11, struct.pack('<Q', 56 ** 11 - 1)) == bytearray(b'9' * 11)
+    assert shortstr._randomGlyphs(shortstr._GLYPHS_BYTES, 3, struct.pack('<Q', 1 + 2 * 56)) == bytearray(b'bca')
+
+    # Words at or above 56 ** 11 would be biased, so they must be redrawn.
+    for trial in range(TRIALS):
+        chars = shortstr._randomGlyphs(shortstr._GLYPHS_BYTES, 12, struct.pack('<2Q', 0, 2 ** 64 - 1))
+        assert len(chars) == 12
+        assert chars[:11] == bytearray(b'a' * 11)
+        assert _isValidShortStr(chars.decode('ascii'))
+
 
 def test_isValid():
-    assert shortstr.isValid('QEynbi')
+    assert shortstr.isValid('QEynbD')
     assert not shortstr.isValid('QEynbX')
 
     # Test that 1 or 2 character strings causes an exception.
@@ -188,6 +347,24 @@ def test_isValid():
         shortstr.isValid(42)
 
 
+def test_isValidMany():
+    assert shortstr.isValidMany(['QEynbD', 'QEynbX', 'kZXmLG']) == [True, False, True]
+    assert shortstr.isValidMany([]) == []
+
+    ssList = [shortstr.generate() for i in range(TRIALS)]
+    assert shortstr.isValidMany(ssList) == [shortstr.isValid(ss) for ss in ssList]
+
+    # Test that non-ASCII strings are simply invalid.
+    assert shortstr.isValidMany(['QEynb\u00e9', '\u00e9QEynbD']) == [False, shortstr.isValid('\u00e9QEynbD')]
+
+    # Test that bad strings cause an exception, same as isValid().
+    with pytest.raises(shortstr.ShortStrException):
+        shortstr.isValidMany(['QEynbD', 'X'])
+
+    with pytest.raises(shortstr.ShortStrException):
+        shortstr.isValidMany([42])
+
+
 def test_performance():
     # We should be able to generate far more than 1000 of these in under a
     # second. If not, something is deeply wrong.
@@ -196,6 +373,10 @@ def test_performance():
         shortstr.generate()
     assert time.time() - startTime < 1
 
+    startTime = time.time()
+    shortstr.generateMany(1000)
+    assert time.time() - startTime < 1
+
 
 
 if __name__ == '__main__':